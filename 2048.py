@@ -1,6 +1,6 @@
+import functools
 import pygame
 import numpy as np
-import random
 
 
 class Config:
@@ -41,10 +41,7 @@ class Config:
 class Game:
     def __init__(self):
         pygame.init()
-        self.screen = pygame.display.set_mode((
-            Config.WINDOW_SIZE, 
-            Config.WINDOW_SIZE + Config.SCORE_AREA_HEIGHT
-        ))
+        self.screen = self._create_display()
         pygame.display.set_caption("2048")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont(None, 60)
@@ -53,29 +50,46 @@ class Game:
         self.renderer = Renderer(self.screen, self.font)
         self.score = 0
         self.running = True
+        self._dirty = True  # Redraw only when something on screen changed
+    
+    def _create_display(self):
+        """Open a double-buffered, vsynced window, without vsync if unsupported."""
+        size = (Config.WINDOW_SIZE, Config.WINDOW_SIZE + Config.SCORE_AREA_HEIGHT)
+        flags = pygame.DOUBLEBUF | pygame.SCALED
+        try:
+            return pygame.display.set_mode(size, flags, vsync=1)
+        except pygame.error:
+            return pygame.display.set_mode(size, flags)
     
     def handle_input(self):
-        """Handle keyboard input and return if the game should continue."""
+        """Handle keyboard input and return if the game should continue.
+        
+        Only the last movement key pressed since the previous frame is applied.
+        """
+        move = None
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
                 return False
             
+            elif event.type == pygame.WINDOWEXPOSED:
+                self._dirty = True
+            
             elif event.type == pygame.KEYDOWN:
-                moved = False
-                score_increase = 0
-                
                 if event.key == pygame.K_w or event.key == pygame.K_UP:
-                    moved, score_increase = self.board.move_up()
+                    move = self.board.move_up
                 elif event.key == pygame.K_s or event.key == pygame.K_DOWN:
-                    moved, score_increase = self.board.move_down()
+                    move = self.board.move_down
                 elif event.key == pygame.K_a or event.key == pygame.K_LEFT:
-                    moved, score_increase = self.board.move_left()
+                    move = self.board.move_left
                 elif event.key == pygame.K_d or event.key == pygame.K_RIGHT:
-                    moved, score_increase = self.board.move_right()
-                
-                if moved:
-                    self.score += score_increase
+                    move = self.board.move_right
+        
+        if move is not None:
+            moved, score_increase = move()
+            if moved:
+                self.score += score_increase
+                self._dirty = True
         
         return True
     
@@ -104,156 +118,288 @@ class Game:
                 # Game over, but continue showing the screen until quit
                 pass
             
-            self.render()
+            if self._dirty:
+                self.render()
+                self._dirty = False
             self.clock.tick(Config.FPS)
         
         pygame.quit()
 
+def _compress_rows(cells):
+    """Move the non-zero cells of every row to the left, keeping their order."""
+    order = np.argsort(cells == 0, axis=1, kind='stable')
+    return np.take_along_axis(cells, order, axis=1)
+
+
+def _reverse_row(row):
+    """Reverse the order of the four nibbles in a 16-bit row."""
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def _unpack_col(row):
+    """Spread the four nibbles of a 16-bit row down the first column."""
+    return (row & 0xF) | (row & 0xF0) << 12 | (row & 0xF00) << 24 | (row & 0xF000) << 36
+
+
+def _build_row_tables():
+    """Precompute the result and score of moving every possible row.
+
+    All 65536 rows are moved at once as an array of exponents. The tables
+    are returned as plain tuples: indexing them with an int is cheaper than
+    indexing an ndarray and keeps the shifted results as Python ints.
+    """
+    rows = np.arange(0x10000, dtype=np.int64)
+    shifts = np.arange(0, 16, 4, dtype=np.int64)
+    cells = _compress_rows((rows[:, np.newaxis] >> shifts) & 0xF)
+    score = np.zeros_like(rows)
+    
+    # Merge adjacent equal tiles (a nibble tops out at 2**15)
+    for j in range(Config.BOARD_SIZE - 1):
+        merge = (cells[:, j] != 0) & (cells[:, j] == cells[:, j + 1]) & (cells[:, j] < 0xF)
+        cells[merge, j] += 1
+        cells[merge, j + 1] = 0
+        score[merge] += 1 << cells[merge, j]
+    
+    # Compress again after merging and repack
+    row_left = np.bitwise_or.reduce(_compress_rows(cells) << shifts, axis=1)
+    
+    # Moving right is moving the mirrored row left; the score is symmetric
+    row_right = _reverse_row(row_left[_reverse_row(rows)])
+    
+    tables = (row_left, row_right, score, _unpack_col(row_left), _unpack_col(row_right))
+    return tuple(tuple(table.tolist()) for table in tables)
+
+
+# Rows are packed as 16 bits and the board as 64, see Board
+if Config.BOARD_SIZE != 4:
+    raise ValueError(f"The packed board only supports BOARD_SIZE = 4, got {Config.BOARD_SIZE}")
+
+_ROW_LEFT, _ROW_RIGHT, _ROW_SCORE, _COL_UP, _COL_DOWN = _build_row_tables()
+_NIBBLE_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+_TILE_VALUES = np.array([0] + [1 << exponent for exponent in range(1, 16)], dtype=np.uint16)
+
+
+def _transpose(state):
+    """Transpose the packed board so that columns become rows."""
+    a1 = state & 0xF0F00F0FF0F00F0F
+    a2 = state & 0x0000F0F00000F0F0
+    a3 = state & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _apply_rows(state, table):
+    """Replace each 16-bit row of the packed board with its table entry."""
+    return (table[state & 0xFFFF]
+            | table[(state >> 16) & 0xFFFF] << 16
+            | table[(state >> 32) & 0xFFFF] << 32
+            | table[state >> 48] << 48)
+
+
+def _apply_cols(transposed, table):
+    """Replace each column of the board with its table entry.
+
+    Takes the transposed board so every column can be looked up as a row;
+    the column tables write their result straight back in column order.
+    """
+    return (table[transposed & 0xFFFF]
+            | table[(transposed >> 16) & 0xFFFF] << 4
+            | table[(transposed >> 32) & 0xFFFF] << 8
+            | table[transposed >> 48] << 12)
+
+
+def _score_rows(state):
+    """Sum the merge score of each 16-bit row of the packed board."""
+    return (_ROW_SCORE[state & 0xFFFF]
+            + _ROW_SCORE[(state >> 16) & 0xFFFF]
+            + _ROW_SCORE[(state >> 32) & 0xFFFF]
+            + _ROW_SCORE[state >> 48])
+
+
+def _empty_cells(state):
+    """Return a mask with the lowest bit of every empty cell's nibble set."""
+    state |= state >> 2
+    state |= state >> 1
+    return ~state & 0x1111111111111111
+
+
 class Board:
+    """The board packed into a single 64-bit int.
+
+    Each cell is a 4-bit exponent (0 for empty, e for the tile 2**e), with
+    cell (row, col) stored at bit 4 * (row * BOARD_SIZE + col). This only
+    works for a 4x4 board and caps tiles at 32768.
+    """
     def __init__(self):
-        self.board = np.zeros((Config.BOARD_SIZE, Config.BOARD_SIZE))
+        self.state = 0
+        self._game_over_cache = None
+        self._rng = np.random.default_rng()
         self._add_new_tile()
         self._add_new_tile()
     
     def get_board(self):
-        return self.board.copy()
-    
-    def _compress_row(self, row):
-        """Remove zeros and compress row to the left."""
-        new_row = [num for num in row if num != 0]
-        return new_row + [0] * (Config.BOARD_SIZE - len(new_row))
+        """Unpack the board into a 2D array of tile values."""
+        exponents = (np.uint64(self.state) >> _NIBBLE_SHIFTS) & np.uint64(0xF)
+        return _TILE_VALUES[exponents].reshape(Config.BOARD_SIZE, Config.BOARD_SIZE)
     
     def _add_new_tile(self):
         """Add a new tile (2 or 4) to a random empty position."""
-        empty_positions = np.argwhere(self.board == 0)
-        if len(empty_positions) == 0:
+        empty = _empty_cells(self.state)
+        if not empty:
             return False
         
-        try:
-            row, col = random.choice(empty_positions)
-            self.board[row][col] = 4 if random.random() < Config.FOUR_CHANCE else 2
-            return True
-        except (IndexError, ValueError):
-            return False
+        # Clear a random number of the lowest empty bits, then take the next one
+        for _ in range(self._rng.integers(empty.bit_count())):
+            empty &= empty - 1
+        cell = empty & -empty
+        
+        # The cell bit is an exponent of 1 (a 2), shifted once it becomes a 4
+        self.state |= cell << 1 if self._rng.random() < Config.FOUR_CHANCE else cell
+        return True
     
-    def _move_left_row(self, row):
-        """Move and merge a single row to the left."""
-        # Compress row
-        new_row = self._compress_row(row)
-        score = 0
+    def _apply_move(self, new_state, lines):
+        """Store the result of a move and return (moved, score).
         
-        # Merge adjacent equal tiles
-        for j in range(Config.BOARD_SIZE - 1):
-            if new_row[j] != 0 and new_row[j] == new_row[j + 1]:
-                new_row[j] *= 2
-                score += new_row[j]
-                new_row[j + 1] = 0
+        The board with the moved lines laid out as rows is passed as lines,
+        and is only scored when the move changed something.
+        """
+        if new_state == self.state:
+            return False, 0
         
-        # Compress again after merging
-        new_row = self._compress_row(new_row)
-        return new_row, score
+        self.state = new_state
+        self._game_over_cache = None
+        self._add_new_tile()
+        return True, _score_rows(lines)
     
     def move_left(self):
         """Move all tiles left and return (moved, score)."""
-        old_board = self.board.copy()
-        total_score = 0
-        
-        for i in range(Config.BOARD_SIZE):
-            new_row, score = self._move_left_row(self.board[i])
-            self.board[i] = new_row
-            total_score += score
-        
-        moved = not np.array_equal(old_board, self.board)
-        if moved:
-            self._add_new_tile()
-        
-        return moved, total_score
+        return self._apply_move(_apply_rows(self.state, _ROW_LEFT), self.state)
     
     def move_right(self):
         """Move all tiles right."""
-        self.board = np.rot90(self.board, 2)
-        moved, score = self.move_left()
-        self.board = np.rot90(self.board, 2)
-        return moved, score
+        return self._apply_move(_apply_rows(self.state, _ROW_RIGHT), self.state)
     
     def move_up(self):
         """Move all tiles up."""
-        self.board = np.rot90(self.board)
-        moved, score = self.move_left()
-        self.board = np.rot90(self.board, 3)
-        return moved, score
+        transposed = _transpose(self.state)
+        return self._apply_move(_apply_cols(transposed, _COL_UP), transposed)
     
     def move_down(self):
         """Move all tiles down."""
-        self.board = np.rot90(self.board, 3)
-        moved, score = self.move_left()
-        self.board = np.rot90(self.board)
-        return moved, score
+        transposed = _transpose(self.state)
+        return self._apply_move(_apply_cols(transposed, _COL_DOWN), transposed)
     
     def is_game_over(self):
         """Check if the game is over (no valid moves)."""
+        if self._game_over_cache is None:
+            self._game_over_cache = self._check_game_over()
+        return self._game_over_cache
+    
+    def _check_game_over(self):
+        """Compute whether any move is left, bypassing the cache."""
+        state = self.state
+        
         # If there are empty tiles, game continues
-        if np.any(self.board == 0):
+        if _empty_cells(state):
             return False
         
-        # Check if any move is possible by testing each direction
-        test_board = Board()
-        test_board.board = self.board.copy()
+        # XOR with the neighbour to the right and below leaves a zero nibble
+        # wherever two tiles are equal; the last column and row are masked off
+        horizontal = _empty_cells(state ^ (state >> 4)) & 0x0111011101110111
+        vertical = _empty_cells(state ^ (state >> 16)) & 0x0000111111111111
         
-        for move_fn in [test_board.move_left, test_board.move_right, 
-                       test_board.move_up, test_board.move_down]:
-            moved, _ = move_fn()  # Returns 2 values
-            if moved:
-                return False
-        
-        return True
+        # Tiles of 2**15 are equal but cannot merge, so those pairs don't count
+        mergeable = ~_empty_cells(~state & 0xFFFFFFFFFFFFFFFF)
+        return not ((horizontal | vertical) & mergeable)
 
 class Renderer:
     def __init__(self, screen, font):
         self.screen = screen
         self.font = font
+        
+        # Text surfaces are cached, rasterizing glyphs every frame is expensive
+        self._tile_text = {
+            value: font.render(str(value), True, Config.BLACK_TEXT)
+            for value in Config.TILE_COLORS
+        }
+        self._score_text = functools.lru_cache(maxsize=256)(self._render_score)
+        
+        # Tile backgrounds are rounded once and blitted, not rasterized per frame
+        self._tile_bg = {
+            value: self._make_tile_surface(color)
+            for value, color in [(0, Config.EMPTY_TILE_COLOR), *Config.TILE_COLORS.items()]
+        }
+        self._unknown_tile_bg = self._make_tile_surface(Config.UNKNOWN_TILE_COLOR)
+        
+        # Tile geometry is fixed, the rects are moved below the score once its
+        # height is known on the first draw
+        self._rects = [
+            [
+                pygame.Rect(
+                    col * (Config.TILE_SIZE + Config.TILE_MARGIN) + Config.TILE_MARGIN,
+                    row * (Config.TILE_SIZE + Config.TILE_MARGIN) + Config.TILE_MARGIN,
+                    Config.TILE_SIZE, Config.TILE_SIZE
+                )
+                for col in range(Config.BOARD_SIZE)
+            ]
+            for row in range(Config.BOARD_SIZE)
+        ]
+        self._board_top_offset = None
+    
+    @staticmethod
+    def _make_tile_surface(color):
+        """Render a rounded tile background onto a transparent surface."""
+        surface = pygame.Surface((Config.TILE_SIZE, Config.TILE_SIZE), pygame.SRCALPHA)
+        pygame.draw.rect(surface, color, surface.get_rect(), border_radius=8)
+        return surface
+    
+    def _render_score(self, score):
+        """Render the score text surface."""
+        return self.font.render(f"Score: {score}", True, Config.TEXT_COLOR)
     
     def draw_board(self, board, score):
         """Draw the game board and score."""
         self.screen.fill(Config.BACKGROUND_COLOR)
         
         # Render score text
-        score_text = self.font.render(f"Score: {int(score)}", True, Config.TEXT_COLOR)
+        score_text = self._score_text(int(score))
         score_rect = score_text.get_rect(
             center=(self.screen.get_width() // 2, Config.TILE_MARGIN + score_text.get_height() // 2)
         )
         self.screen.blit(score_text, score_rect)
         
         # Offset the board below the score
-        board_top_offset = score_rect.bottom + Config.SCORE_MARGIN
+        if self._board_top_offset is None:
+            self._board_top_offset = score_rect.bottom + Config.SCORE_MARGIN
+            for row in self._rects:
+                for rect in row:
+                    rect.move_ip(0, self._board_top_offset)
         
-        # Draw tiles
-        for r in range(Config.BOARD_SIZE):
-            for c in range(Config.BOARD_SIZE):
-                self._draw_tile(board[r][c], r, c, board_top_offset)
+        # Draw tiles, unpacked to Python ints once instead of indexed per cell
+        draw_tile = self._draw_tile
+        for r, row in enumerate(board.tolist()):
+            for c, value in enumerate(row):
+                draw_tile(value, r, c)
     
-    def _draw_tile(self, value, row, col, board_top_offset):
+    def _draw_tile(self, value, row, col):
         """Draw a single tile at the specified position."""
-        rect = pygame.Rect(
-            col * (Config.TILE_SIZE + Config.TILE_MARGIN) + Config.TILE_MARGIN,
-            row * (Config.TILE_SIZE + Config.TILE_MARGIN) + Config.TILE_MARGIN + board_top_offset,
-            Config.TILE_SIZE, Config.TILE_SIZE
-        )
-        
-        # Choose tile color
-        if value == 0:
-            color = Config.EMPTY_TILE_COLOR
-        else:
-            color = Config.TILE_COLORS.get(value, Config.UNKNOWN_TILE_COLOR)
+        screen = self.screen
+        rect = self._rects[row][col]
         
         # Draw tile background
-        pygame.draw.rect(self.screen, color, rect, border_radius=8)
+        screen.blit(self._tile_bg.get(value, self._unknown_tile_bg), rect)
         
         # Draw tile text if not empty
         if value != 0:
-            text = self.font.render(str(int(value)), True, Config.BLACK_TEXT)
+            text = self._tile_text.get(value)
+            if text is None:
+                text = self.font.render(str(value), True, Config.BLACK_TEXT)
+                self._tile_text[value] = text
             text_rect = text.get_rect(center=rect.center)
-            self.screen.blit(text, text_rect)
+            screen.blit(text, text_rect)
     
     def draw_game_over_screen(self, score):
         """Draw the game over screen."""